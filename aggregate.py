@@ -3,7 +3,6 @@ import numpy as np
 import json
 import os
 import math
-from collections import defaultdict, deque
 
 # --- Define normalizer first ---
 def normalize_path(path_str):
@@ -50,172 +49,283 @@ output_columns = [
     'Control Valve max dP'
 ]
 
+# Column types of the raw Dynamo export, so the parser does not have to infer them
+input_dtypes = {
+    'ElementId': str,
+    'StartX_m': 'float64', 'StartY_m': 'float64', 'StartZ_m': 'float64',
+    'EndX_m': 'float64', 'EndY_m': 'float64', 'EndZ_m': 'float64',
+    'SystemName': str,
+    'PipeRunID': str,
+    'SegmentName': str,
+    'Diameter_mm': 'float64',
+    'ConnectedFittingNames': str
+}
+
 # --- 2. Load and process the raw data from Dynamo ---
 try:
-    df = pd.read_csv(input_csv_path)
+    df = pd.read_csv(input_csv_path, dtype=input_dtypes)
 except FileNotFoundError:
     print(f"Error: Input file from Dynamo ('{input_csv_path}') not found.")
     print("Please ensure you have run the Dynamo script first.")
     exit()
 
 # --- 3. Helper Functions ---
-def calculate_length(row):
-    """Calculates the 3D length of a pipe segment."""
-    return np.sqrt(
-        (row['EndX_m'] - row['StartX_m'])**2 +
-        (row['EndY_m'] - row['StartY_m'])**2 +
-        (row['EndZ_m'] - row['StartZ_m'])**2
-    )
-
-def aggregate_fittings(series):
+def most_common(df, column):
     """
-    Aggregates all unique fitting instances from a run and returns a
-    semi-colon separated string of their names.
+    Returns a Series, indexed by run code, of the most frequent non-null value
+    of `column` in each run. Ties resolve to the smallest value, as with `mode()`.
     """
-    unique_fittings_with_id = set()
-    for item in series:
-        if isinstance(item, str):
-            for fitting in item.split(';'):
-                if fitting:
-                    unique_fittings_with_id.add(fitting.strip())
-    fitting_names = []
-    for unique_fitting in sorted(list(unique_fittings_with_id)):
-        name_part = unique_fitting.split('[')[0]
-        fitting_names.append(name_part)
-    return "; ".join(fitting_names)
-
-def _snap_point(pt, tol=0.001):
-    """Snap a coordinate to a tolerance grid to merge near-coincident points."""
-    return (round(pt[0]/tol)*tol, round(pt[1]/tol)*tol, round(pt[2]/tol)*tol)
-
-def find_run_end_elevations(group, tol=0.001):
+    counts = df.groupby(['_run', column], sort=False).size().reset_index(name='n')
+    counts = counts.sort_values(['_run', 'n', column], ascending=[True, False, True])
+    return counts.drop_duplicates('_run').set_index('_run')[column]
+
+def aggregate_fittings(df):
     """
-    Determine start/end elevations for a PipeRunID, accounting for fittings.
+    Aggregates all unique fitting instances of each run and returns a Series,
+    indexed by run code, of semi-colon separated fitting names.
     """
-    # --- Single-segment run: just return its actual endpoints ---
-    if len(group) == 1:
-        row = group.iloc[0]
-        return row['StartZ_m'], row['EndZ_m']
-
-    adj = defaultdict(set)
-    node_z = {}
-
-    for _, row in group.iterrows():
-        p1 = _snap_point((row['StartX_m'], row['StartY_m'], row['StartZ_m']), tol)
-        p2 = _snap_point((row['EndX_m'], row['EndY_m'], row['EndZ_m']), tol)
-        node_z[p1] = p1[2]
-        node_z[p2] = p2[2]
-
-        adj[p1].add(p2)
-        adj[p2].add(p1)
-
-        fittings = row['ConnectedFittingNames']
-        if isinstance(fittings, str) and fittings.strip():
-            for f in fittings.split(';'):
-                f = f.strip()
-                if f:
-                    adj[p1].add(f); adj[f].add(p1)
-                    adj[p2].add(f); adj[f].add(p2)
-                    # approximate fitting elevation as average of connected ends
-                    node_z[f] = (p1[2] + p2[2]) / 2
-
-    if not adj:
-        return 0.0, 0.0
-
-    degrees = {n: len(neigh) for n, neigh in adj.items()}
-    endpoints = [n for n,d in degrees.items() if d == 1]
-
-    def farthest_pair(start_node):
-        seen = {start_node: 0}
-        q = deque([start_node])
-        farthest = start_node
-        while q:
-            u = q.popleft()
-            for v in adj[u]:
-                if v not in seen:
-                    seen[v] = seen[u] + 1
-                    q.append(v)
-                    if seen[v] > seen[farthest]:
-                        farthest = v
-        return farthest, seen
-
-    if len(endpoints) >= 2:
-        a, _ = farthest_pair(endpoints[0])
-        b, _ = farthest_pair(a)
-        za, zb = node_z[a], node_z[b]
-        return (za, zb) if za <= zb else (zb, za)
+    pieces = df['ConnectedFittingNames'].dropna().str.split(';').explode()
+    pieces = pieces[pieces.str.len() > 0].str.strip()
+    runs = df.loc[pieces.index, '_run'].to_numpy(dtype=np.int64)
 
-    # fallback for loops or messy runs: return vertical range
-    zs = [z for z in node_z.values()]
-    return (min(zs), max(zs))
+    # Work on integer codes; the vocabulary is sorted so code order is string order
+    codes, vocab = pd.factorize(pieces, sort=True)
+    names = vocab.str.split('[', n=1).str[0].to_numpy()
 
-# --- 4. Process and Aggregate the Data ---
-df['CalculatedLength_m'] = df.apply(calculate_length, axis=1)
+    # Unique (run, fitting) pairs, ordered by run and then fitting
+    in_run = runs >= 0
+    pair_runs, pair_codes = np.divmod(np.unique(runs[in_run] * len(vocab) + codes[in_run]), len(vocab))
+    return pd.Series(names[pair_codes]).groupby(pair_runs, sort=False).agg('; '.join)
 
-grouped = df.groupby('PipeRunID')
+def _farthest_node(neighbors, start, dist):
+    """
+    Breadth-first search over per-node neighbour lists; returns the node id
+    farthest (in hops) from start. `dist` is a caller-owned buffer of -1s that
+    is restored on return.
+    """
+    dist[start] = 0
+    queue = [start]
+    farthest, max_dist = start, 0
+    for u in queue:
+        d = dist[u] + 1
+        for v in neighbors[u]:
+            if dist[v] < 0:
+                dist[v] = d
+                queue.append(v)
+                if d > max_dist:
+                    farthest, max_dist = v, d
+    for u in queue:
+        dist[u] = -1
+    return farthest
+
+def find_run_end_elevations(df, n_runs, tol=0.001):
+    """
+    Determine start/end elevations for every PipeRunID, accounting for fittings.
 
-aggregated_data = grouped.agg(
-    TotalLength=('CalculatedLength_m', 'sum'),
-    Spec=('SegmentName', lambda x: x.mode().iloc[0] if not x.mode().empty else np.nan),
-    Size=('Diameter_mm', lambda x: x.mode().iloc[0] if not x.mode().empty else np.nan),
-    Fittings=('ConnectedFittingNames', aggregate_fittings)
-).reset_index()
+    Single-segment runs use their segment's endpoints directly. All other runs
+    are built into one vectorized graph; nodes (snapped points and fitting
+    names) are keyed by their run so runs never share nodes.
+    Returns a DataFrame, indexed by run code, with 'StartElevation_m' and
+    'EndElevation_m' columns.
+    """
+    run_codes = df['_run'].to_numpy()
+    start_z = np.full(n_runs, np.nan)
+    end_z = np.full(n_runs, np.nan)
+
+    # Single-segment runs: just use the segment's actual endpoints
+    in_run = run_codes >= 0
+    seg_counts = np.bincount(run_codes[in_run], minlength=n_runs)
+    single_rows = np.zeros(len(run_codes), dtype=bool)
+    single_rows[in_run] = seg_counts[run_codes[in_run]] == 1
+    start_z[run_codes[single_rows]] = df['StartZ_m'].to_numpy()[single_rows]
+    end_z[run_codes[single_rows]] = df['EndZ_m'].to_numpy()[single_rows]
+
+    # Only multi-segment runs go through the graph. A blank coordinate cannot be
+    # snapped to a node, so runs with one are left out and keep NaN elevations.
+    coords = df[['StartX_m', 'StartY_m', 'StartZ_m', 'EndX_m', 'EndY_m', 'EndZ_m']].to_numpy(dtype=float)
+    multi = in_run & ~single_rows
+    blank = multi & ~np.isfinite(coords).all(axis=1)
+    if blank.any():
+        bad_ids = ', '.join(df['ElementId'].to_numpy()[blank].astype(str))
+        print(f"Warning: blank coordinates on segment(s) {bad_ids}; the end elevations of their runs are left empty.")
+        multi &= ~np.isin(run_codes, run_codes[blank])
+    multi_rows = np.flatnonzero(multi)
+    runs = run_codes[multi_rows]
+    n_rows = len(multi_rows)
+
+    # Point nodes: start/end points (interleaved per row) snapped to the tolerance
+    # grid as integer keys and interned per run with np.unique
+    pts = np.empty((2 * n_rows, 3))
+    pts[0::2] = coords[multi_rows, :3]
+    pts[1::2] = coords[multi_rows, 3:]
+    keys = np.empty((2 * n_rows, 4), dtype=np.int64)
+    keys[:, 0] = np.repeat(runs, 2)
+    keys[:, 1:] = np.round(pts / tol)
+    point_keys, point_ids = np.unique(keys, axis=0, return_inverse=True)
+    point_ids = point_ids.ravel()
+    n_points = len(point_keys)
+    u, v = point_ids[0::2], point_ids[1::2]
+    point_z = point_keys[:, 3] * tol
+
+    # Fitting nodes: every named fitting on a segment, interned per run
+    fittings = pd.Series(df['ConnectedFittingNames'].to_numpy()[multi_rows]).dropna()
+    fittings = fittings.str.split(';').explode().str.strip()
+    fittings = fittings[fittings.str.len() > 0]
+    fit_rows = fittings.index.to_numpy(dtype=np.int64)
+    fit_ids, _ = pd.factorize(pd.MultiIndex.from_arrays([runs[fit_rows], fittings.to_numpy()]))
+    n_fittings = fit_ids.max() + 1 if len(fit_ids) else 0
+    # approximate fitting elevation as average of connected ends (last segment wins)
+    fit_z = pd.Series((point_z[u[fit_rows]] + point_z[v[fit_rows]]) / 2).groupby(fit_ids).last()
+
+    fit_run = np.empty(n_fittings, dtype=np.int64)
+    fit_run[fit_ids] = runs[fit_rows]
+
+    # Number nodes in order of first appearance (row by row: start point, end
+    # point, then fittings) so dead ends are visited in the original row order
+    occ_node = np.concatenate([point_ids, n_points + fit_ids])
+    occ_row = np.concatenate([np.arange(2 * n_rows) // 2, fit_rows])
+    fit_slot = 2 + fittings.groupby(level=0).cumcount().to_numpy()
+    occ_slot = np.concatenate([np.arange(2 * n_rows) % 2, fit_slot])
+    _, first_seen = np.unique(occ_node[np.lexsort((occ_slot, occ_row))], return_index=True)
+    appearance = np.argsort(first_seen)
+    n_nodes = len(appearance)
+    relabel = np.empty(n_nodes, dtype=np.int64)
+    relabel[appearance] = np.arange(n_nodes)
+
+    node_z = np.concatenate([point_z, fit_z.to_numpy()])[appearance]
+    node_run = np.concatenate([point_keys[:, 0], fit_run])[appearance]
+    w = n_points + fit_ids
+    edge_u = relabel[np.concatenate([u, u[fit_rows], v[fit_rows]])]
+    edge_v = relabel[np.concatenate([v, w, w])]
+
+    # Undirected adjacency in CSR form: de-duplicated arcs sorted by source node
+    arcs = np.unique(np.concatenate([edge_u * n_nodes + edge_v, edge_v * n_nodes + edge_u]))
+    degrees = np.bincount(arcs // n_nodes, minlength=n_nodes)
+    indptr = np.concatenate([[0], np.cumsum(degrees)]).tolist()
+    indices = (arcs % n_nodes).tolist()
+
+    # Default for loops or messy runs: the vertical range of the run
+    z_by_run = pd.Series(node_z).groupby(node_run)
+    z_min, z_max = z_by_run.min(), z_by_run.max()
+    start_z[z_min.index] = z_min.to_numpy()
+    end_z[z_max.index] = z_max.to_numpy()
+
+    # Runs with at least two dead ends are measured between the farthest pair
+    end_nodes = np.flatnonzero(degrees == 1)
+    end_runs, first_idx = np.unique(node_run[end_nodes], return_index=True)
+    end_counts = np.bincount(node_run[end_nodes], minlength=n_runs)[end_runs]
+
+    # Simple chains (two dead ends, no node above degree 2) need no search:
+    # the farthest pair is just the two dead ends. A self-loop (a segment
+    # shorter than the tolerance) has degree 1 but may sit in a separate
+    # component, so runs containing one are searched as before.
+    max_degree = np.zeros(n_runs, dtype=degrees.dtype)
+    np.maximum.at(max_degree, node_run, degrees)
+    has_loop = np.zeros(n_runs, dtype=bool)
+    has_loop[node_run[edge_u[edge_u == edge_v]]] = True
+    chain = (end_counts == 2) & (max_degree[end_runs] <= 2) & ~has_loop[end_runs]
+    chain_ends = np.isin(node_run[end_nodes], end_runs[chain])
+    end_z_by_run = pd.Series(node_z[end_nodes[chain_ends]]).groupby(node_run[end_nodes[chain_ends]])
+    start_z[end_runs[chain]] = end_z_by_run.min().to_numpy()
+    end_z[end_runs[chain]] = end_z_by_run.max().to_numpy()
+    measured = (end_counts >= 2) & ~chain
+
+    # Scratch shared by every search: neighbour lists are sliced out of the CSR
+    # once (only for nodes of measured runs) and `dist` is reset after each pass
+    neighbors = [None] * n_nodes
+    for u in np.flatnonzero(np.isin(node_run, end_runs[measured])).tolist():
+        neighbors[u] = indices[indptr[u]:indptr[u + 1]]
+    dist = [-1] * n_nodes
+    for run, first_end in zip(end_runs[measured], end_nodes[first_idx][measured]):
+        a = _farthest_node(neighbors, first_end, dist)
+        b = _farthest_node(neighbors, a, dist)
+        za, zb = node_z[a], node_z[b]
+        start_z[run], end_z[run] = (za, zb) if za <= zb else (zb, za)
 
-elevation_data = grouped.apply(find_run_end_elevations).reset_index(name='elevations')
-elevation_data[['StartElevation_m', 'EndElevation_m']] = pd.DataFrame(
-    elevation_data['elevations'].tolist(), index=elevation_data.index
-)
+    return pd.DataFrame(
+        {'StartElevation_m': start_z, 'EndElevation_m': end_z},
+        index=pd.RangeIndex(n_runs, name='_run')
+    )
 
-final_aggregated_df = pd.merge(
-    aggregated_data,
-    elevation_data[['PipeRunID', 'StartElevation_m', 'EndElevation_m']],
-    on='PipeRunID'
+# --- 4. Process and Aggregate the Data ---
+# Factorize PipeRunID once; every aggregation groups by the integer run code
+# (-1 marks rows without a PipeRunID, which are left out of the output).
+run_codes, run_ids = pd.factorize(df['PipeRunID'], sort=True)
+df['_run'] = run_codes.astype(np.int32)
+run_index = pd.RangeIndex(len(run_ids), name='_run')
+
+# 3D length of every pipe segment, computed column-wise over the whole frame.
+# The squares and sums are done in place so no further temporaries are allocated.
+dx = df['EndX_m'].to_numpy() - df['StartX_m'].to_numpy()
+dy = df['EndY_m'].to_numpy() - df['StartY_m'].to_numpy()
+dz = df['EndZ_m'].to_numpy() - df['StartZ_m'].to_numpy()
+dx *= dx
+dy *= dy
+dz *= dz
+dx += dy
+dx += dz
+df['CalculatedLength_m'] = np.sqrt(dx, out=dx)
+
+# Per-run total length summed straight over the run codes (missing lengths count as 0)
+in_run = run_codes >= 0
+total_length = np.bincount(
+    run_codes[in_run],
+    weights=np.nan_to_num(df['CalculatedLength_m'].to_numpy()[in_run]),
+    minlength=len(run_ids)
 )
 
+aggregated_data = pd.DataFrame({'PipeRunID': run_ids, 'TotalLength': total_length}, index=run_index)
+aggregated_data['Spec'] = most_common(df, 'SegmentName').reindex(run_index)
+aggregated_data['Size'] = most_common(df, 'Diameter_mm').reindex(run_index)
+aggregated_data['Fittings'] = aggregate_fittings(df).reindex(run_index, fill_value='')
+
+# Every per-run result shares the run-code index, so they line up without a merge
+elevation_data = find_run_end_elevations(df, len(run_ids))
+final_aggregated_df = pd.concat([aggregated_data, elevation_data], axis=1)
+
 # --- 5. Create the Pipe and Node DataFrames ---
-pipe_data = []
-node_data = []
-
-for _, row in final_aggregated_df.iterrows():
-    pipe_entry = {
-        'device_type': 'pipe',
-        'name': row['PipeRunID'],
-        'length': row['TotalLength'],
-        'spec': row['Spec'],
-        'fittings': row['Fittings'],
-        'size': row['Size']
-    }
-    pipe_data.append(pipe_entry)
-
-    start_node = {
-        'device_type': 'node',
-        'name': f"{row['PipeRunID']}_StartNode",
-        'elevation': row['StartElevation_m']
-    }
-    end_node = {
-        'device_type': 'node',
-        'name': f"{row['PipeRunID']}_EndNode",
-        'elevation': row['EndElevation_m']
-    }
-    node_data.extend([start_node, end_node])
-
-pipe_output_df = pd.DataFrame(pipe_data, columns=output_columns)
-node_output_df = pd.DataFrame(node_data, columns=output_columns)
+run_names = final_aggregated_df['PipeRunID'].astype(str)
+
+pipe_output_df = pd.DataFrame({
+    'device_type': 'pipe',
+    'name': final_aggregated_df['PipeRunID'],
+    'length': final_aggregated_df['TotalLength'],
+    'spec': final_aggregated_df['Spec'],
+    'fittings': final_aggregated_df['Fittings'],
+    'size': final_aggregated_df['Size']
+}).reindex(columns=output_columns)
+
+start_nodes = pd.DataFrame({
+    'device_type': 'node',
+    'name': run_names + '_StartNode',
+    'elevation': final_aggregated_df['StartElevation_m']
+})
+end_nodes = pd.DataFrame({
+    'device_type': 'node',
+    'name': run_names + '_EndNode',
+    'elevation': final_aggregated_df['EndElevation_m']
+})
+# Keep each run's start node directly followed by its end node
+node_output_df = (
+    pd.concat([start_nodes, end_nodes])
+    .sort_index(kind='stable')
+    .reindex(columns=output_columns)
+)
 
 
 # --- 6. Combine and Save ---
-final_output_df = pd.concat([pipe_output_df, node_output_df], ignore_index=True).fillna('')
+# Missing values are left as NaN; to_csv writes them as empty cells
+final_output_df = pd.concat([pipe_output_df, node_output_df], ignore_index=True)
 
 # --- MODIFICATION: Get and print the unique fittings list ---
-all_fittings_series = df['ConnectedFittingNames'].dropna().str.split(';').explode()
-unique_fitting_names = all_fittings_series.str.split('[').str[0].str.strip().unique()
-all_fittings_str = "; ".join(sorted(unique_fitting_names))
+all_fittings = pd.unique(df['ConnectedFittingNames'].dropna().str.split(';').explode())
+all_fittings_str = "; ".join(sorted({f.split('[')[0].strip() for f in all_fittings}))
 
 try:
     final_output_df.to_csv(output_csv_path, index=False, encoding='utf-8-sig')
     print(f" Successfully created formatted CSV file: '{output_csv_path}'")
     print("\n--- Final Data Preview ---")
-    print(final_output_df.head(10))
+    print(final_output_df.head(10).fillna(''))
     
     print("\n--- Unique Fittings Reference List ---")
     print(f"Here is a clean list of all unique fittings found in the Revit export:\n\n{all_fittings_str}")
@@ -1,6 +1,9 @@
 import csv
+import io
 import os
-import copy
+import re
+import sys
+from operator import itemgetter
 
 # --- Configuration Data ---
 
@@ -70,12 +73,60 @@ VALIDATION_RULES = {
     "boolean": ["Source"]
 }
 
+# Lookup forms of the rules above, built once at import.
+DEVICE_TYPES = tuple(DEVICE_PARAMETERS)
+DEVICE_MENU = "".join(f"{i+1}. {dtype}\n" for i, dtype in enumerate(DEVICE_TYPES))
+EDIT_PARAMS = {dtype: ("device_type",) + tuple(params) for dtype, params in DEVICE_PARAMETERS.items()}
+NUMERIC_PARAMS = frozenset(VALIDATION_RULES["numeric"])
+BOOLEAN_PARAMS = frozenset(VALIDATION_RULES["boolean"])
+CHOICE_PARAMS = {
+    param: tuple(options) for param, options in VALIDATION_RULES.items()
+    if param not in ("numeric", "boolean")
+}
+
+
+# --- Data Model ---
+
+class Table:
+    """Column store for the CSV rows: one list of values per header, in HEADERS order."""
+
+    def __init__(self):
+        self.cols = {header: [] for header in HEADERS}
+        self.n = 0
+
+    def __len__(self):
+        return self.n
+
+    def append(self, values):
+        """Appends one row given as an iterable of values in HEADERS order."""
+        for column, value in zip(self.cols.values(), values):
+            column.append(value)
+        self.n += 1
+
+    def pop(self, i):
+        """Removes row i from every column."""
+        for column in self.cols.values():
+            column.pop(i)
+        self.n -= 1
+
+    def row(self, i):
+        """Returns row i as a list of values in HEADERS order."""
+        return [column[i] for column in self.cols.values()]
+
+    def rows(self):
+        """Iterates over the rows as tuples in HEADERS order."""
+        return zip(*self.cols.values())
+
 
 # --- UI and Display Functions ---
 
+# ANSI "erase display, cursor home" sequence used instead of spawning cls/clear
+CLEAR_SCREEN = "\x1b[2J\x1b[H"
+
 def clear_screen():
     """Clears the terminal screen."""
-    os.system('cls' if os.name == 'nt' else 'clear')
+    sys.stdout.write(CLEAR_SCREEN)
+    sys.stdout.flush()
 
 def display_data(data):
     """Displays the current CSV data in a formatted table."""
@@ -83,12 +134,14 @@ def display_data(data):
         print("CSV is currently empty.\n")
         return
 
-    print("--- Current CSV Data ---")
-    print(f"{'Row':<5}{'Device Type':<15}{'Name':<30}")
-    print("-" * 50)
-    for i, row in enumerate(data):
-        print(f"{i+1:<5}{row.get('device_type', ''):<15}{row.get('name', ''):<30}")
-    print("\n" + "=" * 50 + "\n")
+    # Build the whole table first and write it in one call
+    lines = ["--- Current CSV Data ---", f"{'Row':<5}{'Device Type':<15}{'Name':<30}", "-" * 50]
+    lines.extend(
+        f"{i:<5}{device_type:<15}{name:<30}"
+        for i, device_type, name in zip(range(1, data.n + 1), data.cols['device_type'], data.cols['name'])
+    )
+    lines.append("\n" + "=" * 50 + "\n\n")
+    sys.stdout.write("\n".join(lines))
 
 def show_instructions():
     """Displays a detailed help message for the user."""
@@ -119,6 +172,36 @@ def show_instructions():
 
 # --- Core Logic ---
 
+def validate_text(value):
+    """Accepts any free-text value as typed."""
+    return True, value
+
+# Plain decimal or scientific notation, e.g. "12", "-0.5", ".25", "1e3"
+NUMBER_PATTERN = re.compile(r'[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?')
+
+def validate_numeric(value):
+    """Accepts a number or a blank value."""
+    stripped = value.strip()
+    if stripped == "":
+        return True, ""
+    if NUMBER_PATTERN.fullmatch(stripped):
+        return True, value
+    return False, "This value must be a number."
+
+def validate_boolean(value):
+    """Maps yes/no style answers to 'TRUE'/'FALSE' (blank means no)."""
+    answer = value.lower()
+    if answer in ('y', 'yes', 'true'):
+        return True, 'TRUE'
+    if answer in ('n', 'no', 'false', ''):
+        return True, 'FALSE'
+    return False, "Please enter 'yes' or 'no'."
+
+# Validator for every typed parameter; each returns (ok, value or error message).
+PARAM_VALIDATOR = dict.fromkeys(HEADERS, validate_text)
+PARAM_VALIDATOR.update(dict.fromkeys(NUMERIC_PARAMS, validate_numeric))
+PARAM_VALIDATOR.update(dict.fromkeys(BOOLEAN_PARAMS, validate_boolean))
+
 def get_choice_from_options(param, options):
     """Presents a numbered menu for a list of options and returns the chosen string."""
     print(f"  - Please choose a '{param}':")
@@ -133,8 +216,9 @@ def get_choice_from_options(param, options):
 def get_validated_input(param):
     """Gets and validates user input for a specific parameter, showing a menu if applicable."""
     # Check if the parameter has a predefined list of choices
-    if param in VALIDATION_RULES and param not in VALIDATION_RULES['numeric'] and param not in VALIDATION_RULES['boolean']:
-        return get_choice_from_options(param, VALIDATION_RULES[param])
+    options = CHOICE_PARAMS.get(param)
+    if options:
+        return get_choice_from_options(param, options)
 
     # Otherwise, fall back to text-based input
     prompt = f"  - Enter value for '{param}'"
@@ -142,35 +226,25 @@ def get_validated_input(param):
         prompt += f" {PARAMETER_HINTS[param]}"
     prompt += ": "
 
+    validator = PARAM_VALIDATOR[param]
     while True:
         value = input(prompt)
         if value.strip() == '?':
             print(f"      HELP: {PARAMETER_HELP.get(param, 'No details available.')}")
             continue
 
-        # --- Validation Checks ---
-        if param in VALIDATION_RULES['numeric']:
-            if value.strip() == "": return ""
-            try:
-                float(value)
-                return value
-            except ValueError:
-                print("      ERROR: This value must be a number.")
-        elif param in VALIDATION_RULES['boolean']:
-            if value.lower() in ['y', 'yes', 'true']: return 'TRUE'
-            elif value.lower() in ['n', 'no', 'false', '']: return 'FALSE'
-            else: print("      ERROR: Please enter 'yes' or 'no'.")
-        else:
-            return value
+        ok, result = validator(value)
+        if ok:
+            return result
+        print(f"      ERROR: {result}")
 
 def add_device(data):
     """Guides the user to add a new device row with validation."""
     clear_screen()
     print("--- Add New Device ---")
     
-    device_options = list(DEVICE_PARAMETERS.keys())
-    for i, dtype in enumerate(device_options):
-        print(f"{i+1}. {dtype}")
+    device_options = DEVICE_TYPES
+    sys.stdout.write(DEVICE_MENU)
     
     choice = ""
     while not choice.isdigit() or not 1 <= int(choice) <= len(device_options):
@@ -186,7 +260,7 @@ def add_device(data):
     for param in required_params:
         new_row[param] = get_validated_input(param)
 
-    data.append(new_row)
+    data.append(new_row.values())
     print(f"\nSuccessfully added '{device_type}' device.")
     input("Press Enter to continue...")
 
@@ -208,14 +282,14 @@ def edit_device(data):
             return
 
         row_index = row_num - 1
-        selected_row = data[row_index]
-        device_type = selected_row['device_type']
+        cols = data.cols
+        device_type = cols['device_type'][row_index]
         
         print(f"\n--- Editing Row {row_num} (device_type: {device_type}) ---")
         
-        relevant_params = ["device_type"] + DEVICE_PARAMETERS.get(device_type, [])
+        relevant_params = EDIT_PARAMS.get(device_type, ("device_type",))
         for i, param in enumerate(relevant_params):
-            print(f"  {i+1}. {param}: {selected_row.get(param, '')}")
+            print(f"  {i+1}. {param}: {cols[param][row_index]}")
 
         field_num_str = input("\nEnter the number of the field to edit (or 'c' to cancel): ")
         if field_num_str.lower() == 'c': return
@@ -228,21 +302,21 @@ def edit_device(data):
         
         field_to_edit = relevant_params[field_num - 1]
         
-        print(f"\nCurrent value for '{field_to_edit}' is '{selected_row.get(field_to_edit, '')}'")
+        print(f"\nCurrent value for '{field_to_edit}' is '{cols[field_to_edit][row_index]}'")
         new_value = get_validated_input(field_to_edit)
 
         if field_to_edit == 'device_type':
             if new_value.lower() in DEVICE_PARAMETERS:
-                old_params = DEVICE_PARAMETERS.get(selected_row['device_type'], [])
+                old_params = DEVICE_PARAMETERS.get(device_type, [])
                 new_params = DEVICE_PARAMETERS.get(new_value.lower(), [])
                 for p in old_params:
                     if p not in new_params:
-                       selected_row[p] = ""
-                selected_row['device_type'] = new_value.lower()
+                       cols[p][row_index] = ""
+                cols['device_type'][row_index] = new_value.lower()
             else:
                 print("Invalid new device_type. No change made.")
         else:
-             selected_row[field_to_edit] = new_value
+             cols[field_to_edit][row_index] = new_value
         
         print("\nRow updated successfully.")
 
@@ -266,8 +340,9 @@ def delete_device(data):
         
         row_num = int(row_num_str)
         if 1 <= row_num <= len(data):
-            deleted_item = data.pop(row_num - 1)
-            print(f"Successfully deleted row {row_num} (Device: {deleted_item.get('name', 'N/A')}).")
+            deleted_name = data.cols['name'][row_num - 1]
+            data.pop(row_num - 1)
+            print(f"Successfully deleted row {row_num} (Device: {deleted_name}).")
         else:
             print("Invalid row number.")
     except ValueError:
@@ -287,9 +362,7 @@ def copy_device(data):
 
         row_num = int(row_num_str)
         if 1 <= row_num <= len(data):
-            original_row = data[row_num - 1]
-            new_row = copy.deepcopy(original_row)
-            data.append(new_row)
+            data.append(data.row(row_num - 1))
             print(f"Successfully copied row {row_num}. A new row has been added at the end.")
         else:
             print("Invalid row number.")
@@ -308,14 +381,26 @@ def save_to_csv(data):
     if not filename.endswith('.csv'): filename += '.csv'
         
     try:
-        with open(filename, 'w', newline='') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=HEADERS)
-            writer.writeheader()
-            writer.writerows(data)
+        with open(filename, 'w', newline='', buffering=1 << 20) as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(HEADERS)
+            writer.writerows(data.rows())
         print(f"Data successfully saved to '{filename}'.")
     except IOError as e:
         print(f"Error saving file: {e}")
 
+def read_csv_rows(reader, columns):
+    """Yields each remaining row of a csv.reader as a tuple of values in HEADERS order."""
+    positions = [columns[header] for header in HEADERS]
+    pick = itemgetter(*positions)
+    width = max(positions) + 1
+    for record in reader:
+        if len(record) < width:
+            if not record:
+                continue
+            record += [""] * (width - len(record))
+        yield pick(record)
+
 def load_from_csv():
     """Loads data from an existing CSV file."""
     filename = input("Enter the filename of the CSV to load (e.g., 'input.csv'): ")
@@ -323,35 +408,43 @@ def load_from_csv():
         filename += '.csv'
     
     try:
-        with open(filename, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            
-            if not set(HEADERS).issubset(set(reader.fieldnames or [])):
-                 print(f"ERROR: The CSV headers do not match the required format.")
-                 missing = list(set(HEADERS) - set(reader.fieldnames or []))
-                 print(f"The following required headers are missing: {', '.join(missing)}")
-                 input("Press Enter to continue...")
-                 return []
-            
-            loaded_data = list(reader)
-            print(f"Successfully loaded {len(loaded_data)} rows from '{filename}'.")
-            input("Press Enter to continue...")
-            return loaded_data
+        # One bulk read, then the csv parser scans the decoded text in memory
+        with open(filename, 'rb') as csvfile:
+            text = csvfile.read().decode('utf-8-sig')
+        reader = csv.reader(io.StringIO(text, newline=''))
+        fieldnames = next(reader, [])
+        
+        missing = [header for header in HEADERS if header not in fieldnames]
+        if missing:
+             print(f"ERROR: The CSV headers do not match the required format.")
+             print(f"The following required headers are missing: {', '.join(missing)}")
+             input("Press Enter to continue...")
+             return Table()
+        
+        columns = {header: i for i, header in enumerate(fieldnames)}
+        loaded_data = Table()
+        for values in read_csv_rows(reader, columns):
+            loaded_data.append(values)
+        print(f"Successfully loaded {len(loaded_data)} rows from '{filename}'.")
+        input("Press Enter to continue...")
+        return loaded_data
     except FileNotFoundError:
         print(f"ERROR: File '{filename}' not found.")
         print("Please make sure the CSV file is in the same directory as the script.")
         input("Press Enter to continue...")
-        return []
+        return Table()
     except Exception as e:
         print(f"An error occurred while reading the file: {e}")
         input("Press Enter to continue...")
-        return []
+        return Table()
 
 # --- Main Application Loop ---
 
 def main():
     """Main function to run the application loop."""
-    data = []
+    if os.name == 'nt':
+        os.system('')  # enables ANSI escape handling in the Windows console
+    data = Table()
     
     while True:
         clear_screen()
@@ -4,6 +4,7 @@
 import clr
 import System
 import csv
+from operator import itemgetter
 
 # Add Revit API references
 clr.AddReference('RevitAPI')
@@ -37,11 +38,15 @@ def export_pipe_data_to_csv(document, file_path):
     
     FEET_TO_METERS = 0.3048
     FEET_TO_MM = 304.8
+    FITTING_CATEGORY_IDS = frozenset((int(BuiltInCategory.OST_PipeFitting), int(BuiltInCategory.OST_PipeAccessory)))
+    SEGMENT_PARAM = BuiltInParameter.RBS_PIPE_SEGMENT_PARAM
+    DIAMETER_PARAM = BuiltInParameter.RBS_PIPE_DIAMETER_PARAM
 
     for pipe in pipes:
         try:
             element_id = pipe.Id.ToString()
-            system_name = pipe.MEPSystem.Name if pipe.MEPSystem and pipe.MEPSystem.Name else "N/A"
+            system = pipe.MEPSystem
+            system_name = (system.Name if system else None) or "N/A"
             
             pipe_run_id = "N/A"
             param_pipe_run_id = pipe.LookupParameter("PipeRunID")
@@ -49,40 +54,48 @@ def export_pipe_data_to_csv(document, file_path):
                 pipe_run_id = param_pipe_run_id.AsString()
 
             segment_name = "N/A"
-            segment_param = pipe.get_Parameter(BuiltInParameter.RBS_PIPE_SEGMENT_PARAM)
+            segment_param = pipe.get_Parameter(SEGMENT_PARAM)
             if segment_param and segment_param.HasValue:
                 segment_name = segment_param.AsValueString()
 
             diameter_mm = 0.0
-            diameter_param = pipe.get_Parameter(BuiltInParameter.RBS_PIPE_DIAMETER_PARAM)
+            diameter_param = pipe.get_Parameter(DIAMETER_PARAM)
             if diameter_param:
                 diameter_mm = diameter_param.AsDouble() * FEET_TO_MM
 
-            location = pipe.Location
-            if not (location and hasattr(location, 'Curve')):
+            curve = getattr(pipe.Location, 'Curve', None)
+            if curve is None:
                 continue
             
-            curve = location.Curve
             start_point = curve.GetEndPoint(0)
             end_point = curve.GetEndPoint(1)
 
             # --- MODIFICATION START ---
-            unique_fittings = {}
-            if pipe.ConnectorManager:
-                for connector in pipe.ConnectorManager.Connectors:
+            # Each connected element is checked once; Name is only read for new fittings
+            seen_ids = set()
+            fittings_out = []
+            connector_manager = pipe.ConnectorManager
+            if connector_manager:
+                for connector in connector_manager.Connectors:
                     for connected_ref in connector.AllRefs:
                         owner = connected_ref.Owner
+                        if not owner:
+                            continue
+                        owner_id = owner.Id
+                        if owner_id in seen_ids:
+                            continue
+                        seen_ids.add(owner_id)
+                        category = owner.Category
                         # Check if the connected element is a fitting or accessory
-                        if owner and owner.Category and (owner.Category.Id.IntegerValue == int(BuiltInCategory.OST_PipeFitting) or owner.Category.Id.IntegerValue == int(BuiltInCategory.OST_PipeAccessory)):
-                            if owner.Id not in unique_fittings:
-                                unique_fittings[owner.Id] = owner.Name
+                        if category and category.Id.IntegerValue in FITTING_CATEGORY_IDS:
+                            fittings_out.append((owner.Name, owner_id.ToString()))
 
             # Format the collected fittings into a "Name[ID]" string
-            fitting_details_list = ["{}[{}]".format(name, id.ToString()) for id, name in unique_fittings.items()]
+            fitting_details_list = [name + "[" + owner_id_str + "]" for name, owner_id_str in fittings_out]
             fitting_names_str = ";".join(fitting_details_list)
             # --- MODIFICATION END ---
             
-            data_rows.append([
+            data_rows.append((
                 element_id,
                 start_point.X * FEET_TO_METERS, start_point.Y * FEET_TO_METERS, start_point.Z * FEET_TO_METERS,
                 end_point.X * FEET_TO_METERS, end_point.Y * FEET_TO_METERS, end_point.Z * FEET_TO_METERS,
@@ -91,19 +104,17 @@ def export_pipe_data_to_csv(document, file_path):
                 segment_name,
                 round(diameter_mm, 2),
                 fitting_names_str
-            ])
+            ))
         except Exception:
             error_pipes.append(pipe.Id.ToString())
             continue
 
     # --- Sorting Logic ---
     if data_rows:
-        system_name_index = header.index('SystemName')
-        pipe_run_id_index = header.index('PipeRunID')
-        data_rows.sort(key=lambda row: (row[system_name_index], row[pipe_run_id_index]))
+        data_rows.sort(key=itemgetter(header.index('SystemName'), header.index('PipeRunID')))
 
     try:
-        with open(file_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
+        with open(file_path, 'w', newline='', encoding='utf-8-sig', buffering=1 << 20) as csvfile:
             writer = csv.writer(csvfile)
             writer.writerow(header)
             writer.writerows(data_rows)
@@ -0,0 +1,54 @@
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RAW_HEADER = ['ElementId', 'StartX_m', 'StartY_m', 'StartZ_m', 'EndX_m', 'EndY_m', 'EndZ_m',
+              'SystemName', 'PipeRunID', 'SegmentName', 'Diameter_mm', 'ConnectedFittingNames']
+
+
+def run_aggregate(raw_rows):
+    """Runs aggregate.py on `raw_rows` in a scratch folder; returns (stdout, output rows)."""
+    work_dir = tempfile.mkdtemp()
+    try:
+        shutil.copy(os.path.join(REPO_DIR, 'aggregate.py'), work_dir)
+        with open(os.path.join(work_dir, 'config.json'), 'w') as f:
+            json.dump({'revit_export_path': 'raw.csv', 'processed_data_path': 'processed.csv'}, f)
+        with open(os.path.join(work_dir, 'raw.csv'), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(RAW_HEADER)
+            writer.writerows(raw_rows)
+        result = subprocess.run([sys.executable, 'aggregate.py'], cwd=work_dir,
+                                capture_output=True, text=True, check=True)
+        with open(os.path.join(work_dir, 'processed.csv'), encoding='utf-8-sig', newline='') as f:
+            return result.stdout, list(csv.DictReader(f))
+    finally:
+        shutil.rmtree(work_dir)
+
+
+class RunEndElevationTests(unittest.TestCase):
+
+    def test_blank_coordinate_leaves_run_elevations_empty(self):
+        stdout, rows = run_aggregate([
+            ['1', 0, 0, 1.0, 1, 0, 1.5, 'S', 'RUN-A', 'Steel', 50, ''],
+            ['2', 1, 0, 1.5, 2, 0, '', 'S', 'RUN-A', 'Steel', 50, ''],
+            ['3', 0, 0, 3.0, 1, 0, 3.5, 'S', 'RUN-B', 'Steel', 50, ''],
+            ['4', 1, 0, 3.5, 2, 0, 4.0, 'S', 'RUN-B', 'Steel', 50, ''],
+        ])
+        elevations = {row['name']: row['elevation'] for row in rows if row['device_type'] == 'node'}
+
+        self.assertEqual(elevations['RUN-A_StartNode'], '')
+        self.assertEqual(elevations['RUN-A_EndNode'], '')
+        self.assertEqual(float(elevations['RUN-B_StartNode']), 3.0)
+        self.assertEqual(float(elevations['RUN-B_EndNode']), 4.0)
+        self.assertIn('blank coordinates on segment(s) 2', stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
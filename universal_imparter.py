@@ -1,13 +1,18 @@
 import csv
 import os
+import sys
 import json
+import logging
+from functools import lru_cache
+from logging.handlers import MemoryHandler
 
 # (normalize_path removed by user request: config paths are used as-is)
 
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
 # --- Load config.json ---
 try:
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    config_filepath = os.path.join(script_dir, 'config.json')
+    config_filepath = os.path.join(SCRIPT_DIR, 'config.json')
     with open(config_filepath, 'r') as f:
         config = json.load(f)
 except FileNotFoundError:
@@ -23,27 +28,308 @@ def make_path_from_config(path_value):
         return path_value
     if os.path.isabs(path_value):
         return os.path.normpath(path_value)
-    return os.path.normpath(os.path.join(script_dir, path_value))
+    return os.path.normpath(os.path.join(SCRIPT_DIR, path_value))
 
 FITTING_MAP_CSV = make_path_from_config(config['fitting_map_path'])
 PROCESSED_DATA_CSV = make_path_from_config(config['processed_data_path'])
 
+# Verbosity of the per-row log: INFO lists every updated device, WARNING
+# reports only problems
+LOG_LEVEL = str(config.get('log_level', 'INFO')).upper()
+if not isinstance(logging.getLevelName(LOG_LEVEL), int):
+    print(f"WARNING: Unknown log_level '{config['log_level']}' in config.json. Using INFO.")
+    LOG_LEVEL = 'INFO'
+
+# Number of columns in the processed data CSV (device_type .. Control Valve max dP)
+ROW_WIDTH = 19
 
-def get_flo_fitting_name(revit_name, keyword_map):
-    for keyword, flo_name in keyword_map.items():
+
+def get_flo_fitting_name(revit_name, keyword_pairs):
+    # First keyword (in fitting map order) contained in the Revit name wins
+    for keyword, flo_name in keyword_pairs:
         if keyword in revit_name:
             return flo_name
     return None
 
+def make_fitting_resolver(keyword_map):
+    # Maps a Revit fitting name to a Pipe-Flo fitting name: exact map entry,
+    # then keyword match, then the name itself. Results are cached because the
+    # same fitting names repeat on many pipes.
+    keyword_pairs = tuple(keyword_map.items())
+
+    @lru_cache(maxsize=None)
+    def resolve_fitting(revit_name):
+        return keyword_map.get(revit_name) or get_flo_fitting_name(revit_name, keyword_pairs) or revit_name
+
+    return resolve_fitting
+
 def safe_float(value, default=None):
+    # Callers pass CSV cells (already stripped) or None
+    if not value:
+        return default
     try:
-        if value is None or str(value).strip() == '':
-            return default
         return float(value)
     except (ValueError, TypeError):
         return default
 
+def get_model_object(ctx, getter, name):
+    # Resolves a Pipe-Flo object by name through doc.<getter>, remembering hits
+    # until the run ends or the active lineup changes. Failed lookups raise as
+    # before and are not cached.
+    key = (getter, name)
+    obj = ctx['objects'].get(key)
+    if obj is None:
+        obj = getattr(ctx['doc'], getter)(name)
+        ctx['objects'][key] = obj
+    return obj
+
+# --- Row log ---
+# Per-row results go through this logger. INFO lines are held in a
+# MemoryHandler and written to the console in batches; any warning or error
+# flushes the batch first, so the log stays in row order.
+log = logging.getLogger('universal_imparter')
+
+def open_row_log():
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter('%(message)s'))
+    row_log = MemoryHandler(capacity=1000, flushLevel=logging.WARNING, target=console)
+    log.setLevel(LOG_LEVEL)
+    log.propagate = False
+    log.addHandler(row_log)
+    return row_log
+
+def close_row_log(row_log):
+    # Writes whatever is still buffered and detaches the handler, so a re-run
+    # in the same Pipe-Flo session does not print every line twice
+    console = row_log.target
+    log.removeHandler(row_log)
+    row_log.close()
+    console.close()
+
+# --- Row handlers ---
+# Each handler applies one CSV row to the Pipe-Flo model, reports through
+# `log`, and returns (updates, errors) for that row. `cells` is the row
+# stripped and padded to ROW_WIDTH. `ctx` carries the Pipe-Flo document, the
+# objects resolved from it so far, the fitting library and the fitting name
+# resolver.
+
+# ---------------- PIPE ----------------
+def handle_pipe(cells, row_num, ctx):
+    name = cells[1]
+    if not name:
+        return 0, 0
+    try:
+        pipe_obj = get_model_object(ctx, 'get_pipe', name)
+    except RuntimeError:
+        log.error('ERROR (Row %s): Did not find pipe: %s', row_num, name)
+        return 0, 1
+
+    errors = 0
+    pipe_updated_successfully = False
+
+    # Update Length
+    length_val = safe_float(cells[3])
+    if length_val is not None:
+        try:
+            pipe_obj.set_length(length(length_val, meters_length))
+            pipe_updated_successfully = True
+        except Exception as e:
+            log.error('ERROR (Row %s, Pipe %s): Could not set length. Details: %s', row_num, name, e)
+            errors += 1
+
+    # Update Specification
+    if cells[4]:
+        try:
+            pipe_obj.set_specification(cells[4])
+            pipe_updated_successfully = True
+        except Exception as e:
+            log.error('ERROR (Row %s, Pipe %s): Could not set specification. Details: %s', row_num, name, e)
+            errors += 1
+
+    # Update Size
+    if cells[5]:
+        try:
+            pipe_obj.set_pipe_size(cells[5] + ' mm')
+            pipe_updated_successfully = True
+        except Exception as e:
+            log.error('ERROR (Row %s, Pipe %s): Could not set size. Details: %s', row_num, name, e)
+            errors += 1
+
+    # Update Fittings
+    # NOTE: Automatic installation of fittings into Pipe-Flo is disabled by default.
+    # The original logic collected fittings from the CSV and attempted to map and
+    # install them on the template pipe. That behaviour can be re-enabled by
+    # removing the guard below, but it's commented out to avoid unexpected
+    # modifications to Pipe-Flo models during initial runs or testing.
+    fitting_library = ctx['fitting_library']
+    if False and cells[6] and fitting_library:
+        resolve_fitting = ctx['resolve_fitting']
+        fittings_to_install = []
+        # Skip empty entries left by stray or trailing ';'
+        revit_fitting_names = filter(None, map(str.strip, cells[6].split(';')))
+        for revit_name in revit_fitting_names:
+            pipeflo_name = resolve_fitting(revit_name)
+            fitting_obj = fitting_library.get(pipeflo_name)
+            if fitting_obj:
+                fittings_to_install.append(fitting_obj)
+            else:
+                log.warning('WARNING (Row %s, Pipe %s): Fitting "%s" not found in template.', row_num, name, pipeflo_name)
+        if fittings_to_install:
+            try:
+                pipe_obj.set_installed_fittings(fittings_to_install)
+                pipe_updated_successfully = True
+            except Exception as e:
+                log.error('ERROR (Row %s, Pipe %s): Failed to set fittings. Details: %s', row_num, name, e)
+                errors += 1
+
+    if pipe_updated_successfully:
+        log.info('Updated Pipe: %s', name)
+        return 1, errors
+    return 0, errors
+
+# ---------------- NODE ----------------
+def handle_node(cells, row_num, ctx):
+    name = cells[1]
+    elev_val = safe_float(cells[2])
+    if name and elev_val is not None:
+        try:
+            node_obj = get_model_object(ctx, 'get_node', name)
+            node_obj.set_elevation(elevation(elev_val, meters_elevation))
+            log.info('Updated Node: %s', name)
+            return 1, 0
+        except Exception as e:
+            log.error('ERROR (Row %s): Could not update node %s. Details: %s', row_num, name, e)
+            return 0, 1
+    return 0, 0
+
+# ---------------- HEATSOURCESINK ----------------
+def handle_heatsourcesink(cells, row_num, ctx):
+    name = cells[1]
+    if not name:
+        return 0, 0
+    try:
+        hss_obj = get_model_object(ctx, 'get_heat_source_sink', name)
+
+        # elevations
+        inlet_val = safe_float(cells[7])
+        if inlet_val is not None:
+            hss_obj.set_inlet_elevation(elevation(inlet_val, meters_elevation))
+
+        outlet_val = safe_float(cells[8])
+        if outlet_val is not None:
+            hss_obj.set_outlet_elevation(elevation(outlet_val, meters_elevation))
+
+        # linked device
+        fcd_name_str = cells[9]
+        if fcd_name_str:
+            hss_obj.set_linked_device(device_link(fcd_name_str))
+
+        # temp tolerance
+        temp_tol_val = safe_float(cells[10])
+        if temp_tol_val is not None:
+            hss_obj.set_temperature_tolerance(temperature_tolerance(temp_tol_val, kelvin_delta))
+
+        # ---------------- NEW DEFAULT LOGIC ----------------
+        # Always default to calculate_heat_transfer_rate unless overridden
+        mode = cells[11].lower() or 'calculate_heat_transfer_rate'
+
+        # Defaults: 100 kW and 1 m3/hr if not provided or invalid
+        heat_transfer_rate_val = safe_float(cells[12], 100.0)
+        thermal_flow_rate_val = safe_float(cells[13], 1.0)
+
+        flow_rate_source_bool = cells[14].upper() == 'TRUE'
+
+        # Unknown modes fall back to your default anyway
+        calc_mode_obj = ctx['hss_modes'].get(mode, calculate_heat_transfer_rate)
+
+        hss_obj.set_thermal_calculation(thermal_calculation(
+            calc_mode_obj,
+            heat_transfer_rate(heat_transfer_rate_val, kw_htr),
+            flow_rate(thermal_flow_rate_val, m3hr),
+            flow_rate_source_bool
+        ))
+
+        log.info('Updated HeatSourceSink: %s', name)
+        return 1, 0
+
+    except Exception as e:
+        log.error('ERROR (Row %s): Could not update heat source/sink %s. Details: %s', row_num, name, e)
+        return 0, 1
+
+# ---------------- LINEUP ----------------
+def handle_lineup(cells, row_num, ctx):
+    lineupname_ = cells[1]
+    if lineupname_:
+        try:
+            ctx['doc'].set_current_lineup(lineupname_)
+            # Objects resolved under the previous lineup are looked up again
+            ctx['objects'].clear()
+            log.info('Set active lineup to: %s', lineupname_)
+            return 1, 0
+        except Exception as e:
+            log.error('ERROR (Row %s): Could not update lineup %s. Details: %s', row_num, lineupname_, e)
+            return 0, 1
+    return 0, 0
+
+# ---------------- CONTROLVALVE ----------------
+def handle_controlvalve(cells, row_num, ctx):
+    name = cells[1]
+    if not name:
+        return 0, 0
+    try:
+        cv_obj = get_model_object(ctx, 'get_control_valve', name)
+
+        elev_val = safe_float(cells[2])
+        if elev_val is not None:
+            cv_obj.set_elevation(elevation(elev_val, meters_elevation))
+
+        # *** MODIFIED SECTION START ***
+        # Default to 'flow_rate' mode if the cell is empty
+        cv_mode_str = cells[15].lower() or 'flow_rate'
+        
+        op_obj = None # Initialize the operation object
+
+        if cv_mode_str == 'flow_rate':
+            # Default to 1.0 m3/hr if the setpoint cell is empty or invalid
+            cv_setpoint_val = safe_float(cells[16], 1.0)
+            if cv_setpoint_val is not None:
+                op_obj = operation(flow_rate(cv_setpoint_val, m3hr))
+        
+        elif cv_mode_str == 'temperature_control':
+            # This mode does not require a setpoint from the CSV
+            op_obj = operation(temperature_control)
+        
+        # If a valid operation object was created, apply it
+        if op_obj:
+            cv_obj.set_operation(op_obj)
+        # *** MODIFIED SECTION END ***
+
+        min_dp_val = safe_float(cells[17])
+        if min_dp_val is not None:
+            cv_obj.set_min_dp(dp(min_dp_val, kPa))
+
+        max_dp_val = safe_float(cells[18])
+        if max_dp_val is not None:
+            cv_obj.set_max_dp(dp(max_dp_val, kPa))
+
+        log.info('Updated Control Valve: %s', name)
+        return 1, 0
+    except Exception as e:
+        log.error('ERROR (Row %s): Could not update control valve %s. Details: %s', row_num, name, e)
+        return 0, 1
+
+# device_type (lower-cased) -> row handler
+HANDLERS = {
+    'pipe': handle_pipe,
+    'node': handle_node,
+    'heatsourcesink': handle_heatsourcesink,
+    'lineup': handle_lineup,
+    'controlvalve': handle_controlvalve,
+}
+
 def initialize_system_data_by_type():
+    # Resolve the Pipe-Flo document once; every lookup below goes through it
+    doc = pipeflo().doc()
     updates = 0
     errors = 0
     fitting_library = {}
@@ -51,9 +337,7 @@ def initialize_system_data_by_type():
 
     # --- Load Fitting Keyword Map ---
     try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        map_filepath = os.path.join(script_dir, FITTING_MAP_CSV)
-        with open(map_filepath, 'r') as map_file:
+        with open(FITTING_MAP_CSV, 'r', newline='', buffering=1 << 20) as map_file:
             reader = csv.reader(map_file)
             next(reader)
             for row in reader:
@@ -66,7 +350,7 @@ def initialize_system_data_by_type():
     # --- Build Fitting Library ---
     try:
         print(f"Building fitting library from '{TEMPLATE_PIPE_NAME}'...")
-        template_pipe = pipeflo().doc().get_pipe(TEMPLATE_PIPE_NAME)
+        template_pipe = doc.get_pipe(TEMPLATE_PIPE_NAME)
         fittings_on_template = template_pipe.get_installed_fittings()
 
         if not fittings_on_template:
@@ -79,230 +363,52 @@ def initialize_system_data_by_type():
     except RuntimeError:
         print(f"WARNING: The template pipe named '{TEMPLATE_PIPE_NAME}' was not found. The script will continue, but no fittings will be installed.")
 
+    ctx = {
+        'doc': doc,
+        'objects': {},
+        # Thermal calculation mode objects by their CSV spelling
+        'hss_modes': {
+            'calculate_heat_transfer_rate': calculate_heat_transfer_rate,
+            'calculate_flow_rate': calculate_flow_rate,
+        },
+        'fitting_library': fitting_library,
+        'resolve_fitting': make_fitting_resolver(fitting_keyword_map),
+    }
+
     # --- Process Main CSV File ---
     try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        csv_filepath = os.path.join(script_dir, PROCESSED_DATA_CSV)
-
-        with open(csv_filepath, 'r') as csvfile:
+        with open(PROCESSED_DATA_CSV, 'r', newline='', buffering=1 << 20) as csvfile:
             reader = csv.reader(csvfile, delimiter=',')
             next(reader)
 
             print('Starting system initialization...')
 
-            for row_num, data_row in enumerate(reader, 2):
-                if not any(field.strip() for field in data_row):
-                    continue
-
-                try:
-                    device_type = data_row[0].strip().lower()
-
-                    # ---------------- PIPE ----------------
-                    if device_type == 'pipe':
-                        name = data_row[1].strip()
-                        if not name:
-                            continue
-                        try:
-                            pipe_obj = pipeflo().doc().get_pipe(name)
-                        except RuntimeError:
-                            print(f'ERROR (Row {row_num}): Did not find pipe: {name}')
-                            errors += 1
-                            continue
-
-                        pipe_updated_successfully = False
-
-                        # Update Length
-                        length_val = safe_float(data_row[3].strip()) if len(data_row) > 3 else None
-                        if length_val is not None:
-                            try:
-                                pipe_obj.set_length(length(length_val, meters_length))
-                                pipe_updated_successfully = True
-                            except Exception as e:
-                                print(f'ERROR (Row {row_num}, Pipe {name}): Could not set length. Details: {e}')
-                                errors += 1
-
-                        # Update Specification
-                        if len(data_row) > 4 and data_row[4].strip():
-                            try:
-                                pipe_obj.set_specification(data_row[4].strip())
-                                pipe_updated_successfully = True
-                            except Exception as e:
-                                print(f'ERROR (Row {row_num}, Pipe {name}): Could not set specification. Details: {e}')
-                                errors += 1
-
-                        # Update Size
-                        if len(data_row) > 5 and data_row[5].strip():
-                            try:
-                                pipe_obj.set_pipe_size(data_row[5].strip() + ' mm')
-                                pipe_updated_successfully = True
-                            except Exception as e:
-                                print(f'ERROR (Row {row_num}, Pipe {name}): Could not set size. Details: {e}')
-                                errors += 1
-
-                        # Update Fittings
-                        # NOTE: Automatic installation of fittings into Pipe-Flo is disabled by default.
-                        # The original logic collected fittings from the CSV and attempted to map and
-                        # install them on the template pipe. That behaviour can be re-enabled by
-                        # removing the guard below, but it's commented out to avoid unexpected
-                        # modifications to Pipe-Flo models during initial runs or testing.
-                        if False and len(data_row) > 6 and data_row[6].strip() and fitting_library:
-                            fittings_to_install = []
-                            revit_fitting_names = [fname.strip() for fname in data_row[6].split(';')]
-                            for revit_name in revit_fitting_names:
-                                pipeflo_name = fitting_keyword_map.get(revit_name) or get_flo_fitting_name(revit_name, fitting_keyword_map) or revit_name
-                                fitting_obj = fitting_library.get(pipeflo_name)
-                                if fitting_obj:
-                                    fittings_to_install.append(fitting_obj)
-                                else:
-                                    print(f'WARNING (Row {row_num}, Pipe {name}): Fitting "{pipeflo_name}" not found in template.')
-                            if fittings_to_install:
-                                try:
-                                    pipe_obj.set_installed_fittings(fittings_to_install)
-                                    pipe_updated_successfully = True
-                                except Exception as e:
-                                    print(f'ERROR (Row {row_num}, Pipe {name}): Failed to set fittings. Details: {e}')
-                                    errors += 1
-
-                        if pipe_updated_successfully:
-                            print(f"Updated Pipe: {name}")
-                            updates += 1
-
-                    # ---------------- NODE ----------------
-                    elif device_type == 'node':
-                        name = data_row[1].strip()
-                        elev_val = safe_float(data_row[2].strip()) if len(data_row) > 2 else None
-                        if name and elev_val is not None:
-                            try:
-                                node_obj = pipeflo().doc().get_node(name)
-                                node_obj.set_elevation(elevation(elev_val, meters_elevation))
-                                print(f"Updated Node: {name}")
-                                updates += 1
-                            except Exception as e:
-                                print(f'ERROR (Row {row_num}): Could not update node {name}. Details: {e}')
-                                errors += 1
-
-                    # ---------------- HEATSOURCESINK ----------------
-                    elif device_type == 'heatsourcesink':
-                        name = data_row[1].strip()
-                        if not name:
-                            continue
-                        try:
-                            hss_obj = pipeflo().doc().get_heat_source_sink(name)
-
-                            # elevations
-                            inlet_val = safe_float(data_row[7].strip()) if len(data_row) > 7 else None
-                            if inlet_val is not None:
-                                hss_obj.set_inlet_elevation(elevation(inlet_val, meters_elevation))
-
-                            outlet_val = safe_float(data_row[8].strip()) if len(data_row) > 8 else None
-                            if outlet_val is not None:
-                                hss_obj.set_outlet_elevation(elevation(outlet_val, meters_elevation))
-
-                            # linked device
-                            fcd_name_str = data_row[9].strip() if len(data_row) > 9 else ""
-                            if fcd_name_str:
-                                hss_obj.set_linked_device(device_link(fcd_name_str))
-
-                            # temp tolerance
-                            temp_tol_val = safe_float(data_row[10].strip()) if len(data_row) > 10 else None
-                            if temp_tol_val is not None:
-                                hss_obj.set_temperature_tolerance(temperature_tolerance(temp_tol_val, kelvin_delta))
-
-                            # ---------------- NEW DEFAULT LOGIC ----------------
-                            # Always default to calculate_heat_transfer_rate unless overridden
-                            mode = data_row[11].strip().lower() if len(data_row) > 11 and data_row[11].strip() else 'calculate_heat_transfer_rate'
-
-                            # Defaults: 100 kW and 1 m3/hr if not provided or invalid
-                            heat_transfer_rate_val = safe_float(data_row[12].strip() if len(data_row) > 12 else '', 100.0)
-                            thermal_flow_rate_val = safe_float(data_row[13].strip() if len(data_row) > 13 else '', 1.0)
-
-                            flow_rate_source_bool = (data_row[14].strip().upper() == 'TRUE') if len(data_row) > 14 else False
-
-                            if mode == 'calculate_heat_transfer_rate':
-                                calc_mode_obj = calculate_heat_transfer_rate
-                            elif mode == 'calculate_flow_rate':
-                                calc_mode_obj = calculate_flow_rate
-                            else:
-                                # fallback to your default anyway
-                                calc_mode_obj = calculate_heat_transfer_rate
-
-                            hss_obj.set_thermal_calculation(thermal_calculation(
-                                calc_mode_obj,
-                                heat_transfer_rate(heat_transfer_rate_val, kw_htr),
-                                flow_rate(thermal_flow_rate_val, m3hr),
-                                flow_rate_source_bool
-                            ))
-
-                            print(f"Updated HeatSourceSink: {name}")
-                            updates += 1
-
-                        except Exception as e:
-                            print(f'ERROR (Row {row_num}): Could not update heat source/sink {name}. Details: {e}')
-                            errors += 1
-
-
-                    # ---------------- LINEUP ----------------
-                    elif device_type == 'lineup':
-                        lineupname_ = data_row[1].strip()
-                        if lineupname_:
-                            try:
-                                pipeflo().doc().set_current_lineup(lineupname_)
-                                print(f"Set active lineup to: {lineupname_}")
-                                updates += 1
-                            except Exception as e:
-                                print(f'ERROR (Row {row_num}): Could not update lineup {lineupname_}. Details: {e}')
-                                errors += 1
-
-                    # ---------------- CONTROLVALVE ----------------
-                    elif device_type == 'controlvalve':
-                        name = data_row[1].strip()
-                        if not name:
-                            continue
-                        try:
-                            cv_obj = pipeflo().doc().get_control_valve(name)
-
-                            elev_val = safe_float(data_row[2].strip()) if len(data_row) > 2 else None
-                            if elev_val is not None:
-                                cv_obj.set_elevation(elevation(elev_val, meters_elevation))
-
-                            # *** MODIFIED SECTION START ***
-                            # Default to 'flow_rate' mode if the cell is empty
-                            cv_mode_str = data_row[15].strip().lower() if len(data_row) > 15 and data_row[15].strip() else 'flow_rate'
-                            
-                            op_obj = None # Initialize the operation object
-
-                            if cv_mode_str == 'flow_rate':
-                                # Default to 1.0 m3/hr if the setpoint cell is empty or invalid
-                                cv_setpoint_val = safe_float(data_row[16].strip() if len(data_row) > 16 else '', 1.0)
-                                if cv_setpoint_val is not None:
-                                    op_obj = operation(flow_rate(cv_setpoint_val, m3hr))
-                            
-                            elif cv_mode_str == 'temperature_control':
-                                # This mode does not require a setpoint from the CSV
-                                op_obj = operation(temperature_control)
-                            
-                            # If a valid operation object was created, apply it
-                            if op_obj:
-                                cv_obj.set_operation(op_obj)
-                            # *** MODIFIED SECTION END ***
-
-                            min_dp_val = safe_float(data_row[17].strip()) if len(data_row) > 17 else None
-                            if min_dp_val is not None:
-                                cv_obj.set_min_dp(dp(min_dp_val, kPa))
-
-                            max_dp_val = safe_float(data_row[18].strip()) if len(data_row) > 18 else None
-                            if max_dp_val is not None:
-                                cv_obj.set_max_dp(dp(max_dp_val, kPa))
-
-                            print(f"Updated Control Valve: {name}")
-                            updates += 1
-                        except Exception as e:
-                            print(f'ERROR (Row {row_num}): Could not update control valve {name}. Details: {e}')
-                            errors += 1
-
-                except Exception as e:
-                    print(f'ERROR (Row {row_num}): Invalid row {data_row}. Details: {e}')
-                    errors += 1
+            row_log = open_row_log()
+            try:
+                for row_num, data_row in enumerate(reader, 2):
+                    # Strip every cell once; the stripped cells serve both the
+                    # blank-row test and the handlers
+                    cells = [field.strip() for field in data_row]
+                    if not any(cells):
+                        continue
+
+                    try:
+                        handler = HANDLERS.get(cells[0].lower())
+                        if handler:
+                            if len(cells) < 2:
+                                raise ValueError('row has no name column')
+                            # Pad to the full width so handlers can index any
+                            # column without bounds checks
+                            cells += [''] * (ROW_WIDTH - len(cells))
+                            row_updates, row_errors = handler(cells, row_num, ctx)
+                            updates += row_updates
+                            errors += row_errors
+
+                    except Exception as e:
+                        log.error('ERROR (Row %s): Invalid row %s. Details: %s', row_num, data_row, e)
+                        errors += 1
+            finally:
+                close_row_log(row_log)
 
     except FileNotFoundError:
         print(f"FATAL ERROR: The processed data file '{PROCESSED_DATA_CSV}' was not found.")